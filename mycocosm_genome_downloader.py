@@ -12,16 +12,23 @@ certain assembly, v1.0 will not be available anymore)
 """
 
 import argparse
-import codecs
 import csv
+import dbm
+import os
+import re
+import shelve
 import shutil
 import subprocess as sp
+import sys
+import threading
 import time
 from collections import defaultdict
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from getpass import getpass
 from pathlib import Path
-from subprocess import DEVNULL, STDOUT, CalledProcessError
+from subprocess import STDOUT
+from types import MappingProxyType
 
 from ete4.ncbi_taxonomy import NCBITaxa
 from lxml import etree
@@ -35,16 +42,16 @@ __version__ = "v1.4.0"
 # ============================================================================
 
 # TaxIds that need manual correction (merged or outdated in NCBI)
-ALT_TAXID: dict[str, str] = {
+ALT_TAXID: MappingProxyType[str, str] = MappingProxyType({
     "1140396": "2735509",
     "585595": "2587404",
     "5145": "2587412",
     "1437435": "2211651",
-}
+})
 
 # Main branches of the JGI fungal taxonomy tree
 # See https://genome.jgi.doe.gov/programs/fungi/index.jsf
-JGI_TREE_BRANCHES: set[str] = {
+JGI_TREE_BRANCHES: frozenset[str] = frozenset({
     "pucciniomycotina",
     "ustilaginomycotina",
     "agaricomycetes",
@@ -73,26 +80,48 @@ JGI_TREE_BRANCHES: set[str] = {
     "neocallimastigomycota",
     "microsporidia",
     "cryptomycota",
-}
+})
+
+# Folder structure above the JGI tree branches, as
+# (rank, folders, sub-levels, exclusive). At each level, every entry whose
+# rank is in the lineage adds its folders (None always matches), in order,
+# until an exclusive one matches. The search goes on with the sub-levels of
+# the last match.
+LINEAGE_FOLDERS: tuple = (
+    ("dikarya", ("DIKARYA",), (
+        ("ascomycota", ("ASCOMYCOTA",), (
+            ("pezizomycotina", ("PEZIZOMYCOTINA",), (), True),
+        ), True),
+        ("basidiomycota", ("BASIDIOMYCOTA",), (
+            ("agaricomycotina", ("AGARICOMYCOTINA",), (), True),
+        ), True),
+    ), True),
+    (None, ("no_rank",), (
+        # Independent checks: a lineage can have several of these
+        ("mucoromycota", ("MUCOROMYCOTA",), (), False),
+        ("zoopagomycota", ("ZOOPAGOMYCOTA",), (), False),
+        ("chytridiomycota", ("CHYTRIDIOMYCOTA", "no_rank"), (), False),
+    ), True),
+)
 
 # Metaprojects or old versions to exclude from downloads
-PORTALS_TO_REMOVE: set[str] = {
+PORTALS_TO_REMOVE: frozenset[str] = frozenset({
     "Aciri1_meta",
     "Altbr1",
     "Pospl1",  # superseded by PosplRSB12_1
     "Rhoto_IFO0880_2",  
-}
+})
 
 # Translates project shortname to organism name (encoding fixes for some species)
-MANUAL_PROJECT_NAMES: dict[str, str] = {
+MANUAL_PROJECT_NAMES: MappingProxyType[str, str] = MappingProxyType({
     "Boledp1": "Boletus edulis Přilba v1.0",
     "Rusoch1": "Russula ochroleuca Přilba v1.0",
     "Amarub1": "Amanita rubescens Přilba v1.0",
     "Ruseme1": "Russula emetica Přilba v1.0",
-}
+})
 
 # Assembly filenames to ignore (not real assemblies, old versions, or meta-samples)
-EXCLUDE_ASSEMBLIES: set[str] = {
+EXCLUDE_ASSEMBLIES: frozenset[str] = frozenset({
     "1034997.Tuber_borchii_Tbo3840.standard.main.scaffolds.fasta.gz",
     "Spofi1.draft.mito.scaffolds.fasta.gz",
     "Patat1.draft.mito.scaffolds.fasta.gz",
@@ -105,55 +134,78 @@ EXCLUDE_ASSEMBLIES: set[str] = {
     "StenotrophomonasSp_AssemblyScaffolds.fasta.gz",
     "PseudomonasSp_AssemblyScaffolds.fasta.gz",
     "EurotioJF034F_1_RiboAssemblyScaffolds.fasta.gz",
-}
+})
 
 # GFF filenames to ignore (have "GeneCatalog" magic string but are unwanted)
-IGNORE_GFF_FILENAMES: set[str] = {
+IGNORE_GFF_FILENAMES: frozenset[str] = frozenset({
     "Aciri1_meta_GeneCatalog_genes_20111216.gff.gz",
     "Exoaq1_GeneCatalog_20160901.gff3.gz",
     "Exoaq1_GeneCatalog_20160828.gff3.gz",
     "Fonpe1_GeneCatalog_20160901.gff3.gz",
     "Copmic2_FM1_removed_alleles.gff.gz",
-}
-
-# US timezone abbreviations to UTC offsets (for timestamp parsing)
-US_TIMEZONES: dict[str, str] = {
-    "EST": "-0500",
-    "CST": "-0600",
-    "MST": "-0700",
-    "PST": "-0800",
-    "EDT": "-0400",
-    "CDT": "-0500",
-    "MDT": "-0600",
-    "PDT": "-0700",
-}
-
-# Weekday abbreviations to numeric values (for locale-independent parsing)
-US_DAY_NUMBERS: dict[str, str] = {
-    "Sun": "0",
-    "Mon": "1",
-    "Tue": "2",
-    "Wed": "3",
-    "Thu": "4",
-    "Fri": "5",
-    "Sat": "6",
-}
-
-# Month abbreviations to numeric values (for locale-independent parsing)
-US_MONTH_NUMBERS: dict[str, str] = {
-    "Jan": "01",
-    "Feb": "02",
-    "Mar": "03",
-    "Apr": "04",
-    "May": "05",
-    "Jun": "06",
-    "Jul": "07",
-    "Aug": "08",
-    "Sep": "09",
-    "Oct": "10",
-    "Nov": "11",
-    "Dec": "12",
-}
+})
+
+# Assembly version at the end of a project name, e.g. " v2.0"
+VERSION_SUFFIX: re.Pattern = re.compile(r"\s+[vV]\d(?:\S*\d)?$")
+
+# Assembly files with any of these in their name are not the nuclear genome
+UNWANTED_ASSEMBLY_KEYWORDS: re.Pattern = re.compile(
+    r"MitoAssembly|MitoScaffolds|PrimaryAssemblyScaffolds|SecondaryAssemblyScaffolds"
+)
+
+# GFF files with any of these in their name are not gene annotations
+UNWANTED_GFF_KEYWORDS: re.Pattern = re.compile(
+    r"proteins|secondary_alleles|promoter_regions", re.IGNORECASE
+)
+
+# All files listed under a folder of MycoCosm_data.xml
+FILE_ELEMENTS: etree.XPath = etree.XPath(".//file")
+
+# Lineages found with ete4 are stored here (shelve database, next to the
+# genome list) between runs
+LINEAGE_CACHE_NAME: str = ".lineage_cache"
+
+# Number of concurrent requests when querying JGI for each project's file list
+XML_DOWNLOAD_WORKERS: int = 16
+
+# JGI timestamps, e.g. 'Sun Oct 12 11:02:03 PDT 2014' (the day name is unused)
+TIMESTAMP: re.Pattern = re.compile(
+    r"\S+\s+(\w+)\s+(\d+)\s+(\d+):(\d+):(\d+)\s+(\S+)\s+(\d+)"
+)
+
+# Month abbreviations in JGI timestamps (read independently of the locale)
+US_MONTH_NUMBERS: MappingProxyType[str, int] = MappingProxyType({
+    "Jan": 1,
+    "Feb": 2,
+    "Mar": 3,
+    "Apr": 4,
+    "May": 5,
+    "Jun": 6,
+    "Jul": 7,
+    "Aug": 8,
+    "Sep": 9,
+    "Oct": 10,
+    "Nov": 11,
+    "Dec": 12,
+})
+
+# US timezone abbreviations in JGI timestamps, as UTC offsets
+US_TIMEZONES: MappingProxyType[str, timezone] = MappingProxyType({
+    "EST": timezone(timedelta(hours=-5)),
+    "CST": timezone(timedelta(hours=-6)),
+    "MST": timezone(timedelta(hours=-7)),
+    "PST": timezone(timedelta(hours=-8)),
+    "EDT": timezone(timedelta(hours=-4)),
+    "CDT": timezone(timedelta(hours=-5)),
+    "MDT": timezone(timedelta(hours=-6)),
+    "PDT": timezone(timedelta(hours=-7)),
+})
+
+# Default number of assembly/GFF files downloaded at the same time (--jobs)
+DOWNLOAD_WORKERS: int = 8
+
+# Oldest curl with --parallel and the %{exitcode} --write-out variable
+CURL_MIN_VERSION: tuple[int, int] = (7, 75)
 
 
 # ============================================================================
@@ -164,10 +216,27 @@ class JGI_Project:
     """
     Store information about each JGI sequencing project (portal).
     """
+    __slots__ = (
+        "TaxId",
+        "lineage",
+        "portal",
+        "name",
+        "org_name",
+        "assembly_file",
+        "assembly_url",
+        "assembly_size",
+        "gff_file",
+        "gff_url",
+        "gff_timestamp",
+        "gff_size",
+        "project_path",
+        "date",
+        "is_restricted",
+    )
+
     def __init__(self):
         self.TaxId = ""  # NCBI TaxId (not lineage)
-        self.lineage_set = set()  # to quickly check major fungal taxonomy branches
-        self.lineage_list = []
+        self.lineage = ()  # rank names from root down, lowercase
 
         self.portal = ""  # Fam[:2] + Sp[:1] + mystery number. a.k.a.: "shortname"
         self.name = ""  # Portal full name. Include things like "v2.0"
@@ -187,8 +256,6 @@ class JGI_Project:
 
         self.is_restricted = False
 
-        return
-
 
 # ============================================================================
 # COMMAND-LINE INTERFACE
@@ -297,6 +364,20 @@ def command_parser():
         default=False,
         action="store_true"
     )
+    group_output.add_argument(
+        "--hardlink",
+        help="Hard link files found with --previous instead of copying them, \
+            when both folders are on the same filesystem.",
+        default=False,
+        action="store_true"
+    )
+    group_output.add_argument(
+        "--jobs",
+        help=f"Number of files downloaded at the same time \
+            (default: {DOWNLOAD_WORKERS}).",
+        type=int,
+        default=DOWNLOAD_WORKERS
+    )
 
     return parser.parse_args()
 
@@ -305,12 +386,12 @@ def command_parser():
 # AUTHENTICATION
 # ============================================================================
 
-def JGI_login(cookie_path, credentials_file=None):
+def JGI_login(credentials_file=None) -> str:
     """
-    Get (physical) cookie. Needed to download files from JGI.
+    Get the session cookie needed to download files from JGI. It's only kept
+    in memory; an empty string means the login failed.
     
     Args:
-        cookie_path: path where the cookie file should be saved
         credentials_file: optional path to a file containing username and password
     """
     if credentials_file:
@@ -339,6 +420,7 @@ def JGI_login(cookie_path, credentials_file=None):
     # This should be equivalent to:
     # curl 'https://signon.jgi.doe.gov/signon/create' --data-urlencode 'login=USER_NAME' --data-urlencode 'password=USER_PASSWORD' -c cookies > /dev/null
     # See: https://genome.jgi.doe.gov/portal/help/download.jsf#api
+    # The cookie jar is written to stdout ('-c -') instead of a file
     command = []
     command.append("curl")
     command.append("--silent")
@@ -347,20 +429,57 @@ def JGI_login(cookie_path, credentials_file=None):
     command.append(f"login={user}")
     command.append("--data-urlencode")
     command.append(f"password={password}")
+    command.append("--output")
+    command.append(os.devnull)
     command.append("-c")
-    command.append(f"{cookie_path}")
+    command.append("-")
 
     print(" Logging in:")
     print("--------------------------------------------")
-    proc = sp.run(command, shell=False, stdout=DEVNULL)
+    proc = sp.run(command, shell=False, stdout=sp.PIPE, encoding="utf-8")
     try:
         proc.check_returncode()
     except sp.CalledProcessError:
         print(f"Error logging in: {proc.stderr}")
-        return False
+        return ""
     else:
         print("--------------------------------------------\n")
-        return True
+        return parse_cookie_jar(proc.stdout)
+
+
+def parse_cookie_jar(cookie_jar: str) -> str:
+    """
+    Turns a cookie jar written by curl (Netscape format) into a Cookie header
+    value, e.g. 'name1=value1; name2=value2'
+    """
+    cookies = []
+    for line in cookie_jar.splitlines():
+        # HttpOnly cookies are written as comments with this prefix
+        if line.startswith("#HttpOnly_"):
+            line = line[len("#HttpOnly_"):]
+        elif line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) == 7:
+            cookies.append(f"{fields[5]}={fields[6]}")
+
+    return "; ".join(cookies)
+
+
+def curl_config_line(option: str, value: str) -> bytes:
+    """
+    One 'option = "value"' line of a curl configuration (read with '--config -')
+    """
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'{option} = "{escaped}"\n'.encode()
+
+
+def curl_cookie_config(cookie: str) -> bytes:
+    """
+    curl configuration (read with '--config -') that sends the cookie. This
+    keeps it out of the command line, which other users can see.
+    """
+    return curl_config_line("cookie", cookie)
 
 
 # ============================================================================
@@ -370,6 +489,9 @@ def JGI_login(cookie_path, credentials_file=None):
 def get_JGI_genome_list(outputfolder):
     cmd = []
     cmd.append("curl")
+    cmd.append("--retry")
+    cmd.append("5")
+    cmd.append("--compressed")
     cmd.append("https://mycocosm.jgi.doe.gov/ext-api/mycocosm/catalog/download-group?flt=&seq=all&pub=all&grp=fungi&srt=released&ord=asc")
     cmd.append("-o")
     cmd.append(str(outputfolder / "MycoCosm_Genome_list.csv"))
@@ -420,17 +542,9 @@ def remove_version(label):
     """
     Try to remove assembly version from label.
     """
-    suffix = label.strip().split(" ")[-1]
-    if (
-        (suffix[0] == "v" or suffix[0] == "V")
-        and suffix[1].isdigit()
-        and suffix[-1].isdigit()
-    ):
-        # Assume we have one of
-        # v3, v1.0, v2.0, v4.0, v1.2, v2.2, v1.1, v3.0, v2, etc.
-        return " ".join(label.strip().split(" ")[:-1])
-    else:
-        return label
+    # Assume we have one of
+    # v3, v1.0, v2.0, v4.0, v1.2, v2.2, v1.1, v3.0, v2, etc.
+    return VERSION_SUFFIX.sub("", label.strip()) or label
 
 
 def get_final_output_folder(o, lineage_set):
@@ -438,42 +552,28 @@ def get_final_output_folder(o, lineage_set):
     Assembles the path that will contain the files for a particular organism
     based on its lineage.
     """
-    # Build folder structure
-    output_folder = o
-    if "dikarya" in lineage_set:
-        output_folder = output_folder / "DIKARYA"
-
-        if "ascomycota" in lineage_set:
-            output_folder = output_folder / "ASCOMYCOTA"
-
-            if "pezizomycotina" in lineage_set:
-                output_folder = output_folder / "PEZIZOMYCOTINA"
-
-        elif "basidiomycota" in lineage_set:
-            output_folder = output_folder / "BASIDIOMYCOTA"
-
-            if "agaricomycotina" in lineage_set:
-                output_folder = output_folder / "AGARICOMYCOTINA"
-
-    else:
-        output_folder = output_folder / "no_rank"
-
-        if "mucoromycota" in lineage_set:
-            output_folder = output_folder / "MUCOROMYCOTA"
-
-        if "zoopagomycota" in lineage_set:
-            output_folder = output_folder / "ZOOPAGOMYCOTA"
-
-        if "chytridiomycota" in lineage_set:
-            output_folder = output_folder / "CHYTRIDIOMYCOTA" / "no_rank"
+    # Build folder structure. Collect the folder names and make a single
+    # Path at the end, instead of one for each level.
+    parts = [o]
+    level = LINEAGE_FOLDERS
+    while level:
+        next_level = ()
+        for rank, folders, sublevel, exclusive in level:
+            if rank is None or rank in lineage_set:
+                parts.extend(folders)
+                next_level = sublevel
+                if exclusive:
+                    break
+        level = next_level
 
     # Build last folder
-    if len(lineage_set & JGI_TREE_BRANCHES) == 1:
-        output_folder = output_folder / list(lineage_set & JGI_TREE_BRANCHES)[0].upper()
+    branch = lineage_set & JGI_TREE_BRANCHES
+    if len(branch) == 1:
+        parts.append(next(iter(branch)).upper())
     else:
-        output_folder = output_folder / "no_rank"
+        parts.append("no_rank")
 
-    return output_folder
+    return Path(*parts)
 
 
 def read_mycocosm_csv(csvpath: Path) -> dict:
@@ -483,58 +583,94 @@ def read_mycocosm_csv(csvpath: Path) -> dict:
     orgdict = dict()
     # MycoCosm file is downloaded with ISO-8859-1 encoding. Use this to avoid UnicodeDecodeError.
     # See https://stackoverflow.com/questions/12468179/unicodedecodeerror-utf8-codec-cant-decode-byte-0x9c
-    with codecs.open(csvpath, "r", encoding="utf-8", errors="replace") as csvfile:
+    with open(csvpath, encoding="utf-8", errors="replace", newline="") as csvfile:
         # csv reader is needed because the "name" column contains items that
         # contain commas, so a simple split() is not enough
-        csvreader = csv.DictReader(csvfile)
-        for l in csvreader:
+        csvreader = csv.reader(csvfile)
+        header = next(csvreader)
+        i_taxid = header.index("NCBI Taxon")
+        i_portal = header.index("portal")
+        i_name = header.index("name")
+        i_restricted = header.index("is restricted")
+        for row in csvreader:
+            if not row:
+                continue  # blank line
             fungus = JGI_Project()
-            taxid = l["NCBI Taxon"]
-            shortname = l["portal"]
-            fullname = l["name"]
+            taxid = row[i_taxid]
+            shortname = sys.intern(row[i_portal])
+            fullname = row[i_name]
 
             if taxid in ALT_TAXID:
                 taxid = ALT_TAXID[taxid]
 
             fungus.portal = shortname
-            fungus.TaxId = taxid
+            fungus.TaxId = sys.intern(taxid)
             if shortname in MANUAL_PROJECT_NAMES:
                 fungus.name = MANUAL_PROJECT_NAMES[shortname]
             else:
                 fungus.name = fullname
             fungus.org_name = remove_version(fullname)
 
-            ncbi = NCBITaxa()
-            try:
-                ncbi_tax_lineage_ids = ncbi.get_lineage(taxid)
-            except ValueError:
-                ncbi_tax_lineage_ids = []
-                print(
-                    f"Can't find TaxId for {taxid} ({shortname}) with ete (try using --update)."
-                )
+            if row[i_restricted] == "Y":
+                fungus.is_restricted = True
 
-            ncbi_tax_names = ncbi.get_taxid_translator(ncbi_tax_lineage_ids)
-            lineage_set = set(
-                [ncbi_tax_names[tid].lower() for tid in ncbi_tax_lineage_ids]
-            )
-            lineage_list_str = ",".join(
-                [ncbi_tax_names[tid].lower() for tid in ncbi_tax_lineage_ids]
-            )
+            orgdict[shortname] = fungus
 
-            fungus.lineage_set = lineage_set
-            fungus.lineage_list = lineage_list_str
+    # Remove projects we don't want to include
+    for d in PORTALS_TO_REMOVE & orgdict.keys():
+        del orgdict[d]
+
+    # Many projects share a TaxId: query each one only once, then translate
+    # the ids of all lineages in a single call. Lineages are kept on disk
+    # between runs, until the taxonomy database is updated.
+    ncbi = NCBITaxa()
+    taxids = {fungus.TaxId for fungus in orgdict.values()}
+    cache_path = csvpath.parent / LINEAGE_CACHE_NAME
+    try:
+        cache = shelve.open(str(cache_path))
+    except dbm.error as e:
+        print(f"Warning: can't open lineage cache ({cache_path}): {e}. Not caching lineages.")
+        cache = shelve.Shelf(dict())
+    with cache:
+        db_mtime = Path(ncbi.dbfile).stat().st_mtime
+        if cache.get("taxonomy_db_mtime") != db_mtime:
+            cache.clear()
+            cache["taxonomy_db_mtime"] = db_mtime
+
+        lineage_ids_by_taxid = dict()
+        for taxid in taxids:
+            if taxid in cache:
+                continue
+            # Don't bother ete with empty or malformed TaxIds
+            if not taxid.isdigit():
+                lineage_ids_by_taxid[taxid] = []
+                continue
+            try:
+                lineage_ids_by_taxid[taxid] = ncbi.get_lineage(taxid)
+            except ValueError:
+                lineage_ids_by_taxid[taxid] = []
+        ncbi_tax_names = ncbi.get_taxid_translator(
+            set().union(*lineage_ids_by_taxid.values())
+        )
+        for taxid, ncbi_tax_lineage_ids in lineage_ids_by_taxid.items():
+            cache[taxid] = [ncbi_tax_names[tid].lower() for tid in ncbi_tax_lineage_ids]
 
-            fungus.project_path = get_final_output_folder(Path("./"), lineage_set)
+        # Rank names repeat across lineages: keep one copy of each
+        lineage_by_taxid = {
+            taxid: [sys.intern(name) for name in cache[taxid]] for taxid in taxids
+        }
 
-            if l["is restricted"] == "Y":
-                fungus.is_restricted = True
+    for shortname, fungus in orgdict.items():
+        lineage = lineage_by_taxid[fungus.TaxId]
+        if not lineage:
+            print(
+                f"Can't find TaxId for {fungus.TaxId} ({shortname}) with ete (try using --update)."
+            )
 
-            orgdict[shortname] = fungus
+        fungus.lineage = tuple(lineage)
 
-    # Remove projects we don't want to include
-    for d in PORTALS_TO_REMOVE:
-        if d in orgdict:
-            del orgdict[d]
+        # The set is only needed to place the project in the folder tree
+        fungus.project_path = get_final_output_folder(Path("./"), frozenset(lineage))
 
     return orgdict
 
@@ -543,27 +679,55 @@ def read_mycocosm_csv(csvpath: Path) -> dict:
 # XML PROCESSING
 # ============================================================================
 
-def download_project_xml(cookie_path: Path, target_project: str): 
+# lxml parsers can't be shared between threads: each worker keeps its own
+project_xml_parsers = threading.local()
+
+
+def get_project_xml_parser():
+    """Returns this thread's parser for the XML file lists sent by JGI."""
+    if not hasattr(project_xml_parsers, "parser"):
+        project_xml_parsers.parser = etree.XMLParser(
+            huge_tree=True,
+            remove_blank_text=True,
+            collect_ids=False,
+        )
+    return project_xml_parsers.parser
+
+
+def download_project_xml(cookie: str, target_project: str): 
     """Given a cookie and a project name, download XML with file list."""
     command = []
     command.append("curl")
+    command.append("--silent")
+    command.append("--show-error")
     command.append("--retry")
     command.append("5")
+    command.append("--compressed")
     command.append(f"https://genome-downloads.jgi.doe.gov/portal/ext-api/downloads/get-directory?organism={target_project}")
-    command.append("-b")
-    command.append(str(cookie_path))
-
-    try:
-        xml_query = sp.run(command, encoding="utf-8", capture_output=True, check=True)
-    except CalledProcessError as e:
-        print(f"Command {e.cmd} failed")
-        print(e.output)
+    command.append("--config")
+    command.append("-")
+
+    # Parse the XML while it's being downloaded instead of buffering it first
+    project_xml = None
+    with sp.Popen(command, stdin=sp.PIPE, stdout=sp.PIPE, stderr=sp.PIPE) as proc:
+        proc.stdin.write(curl_cookie_config(cookie))
+        proc.stdin.close()
+        try:
+            project_xml = etree.parse(proc.stdout, get_project_xml_parser()).getroot()
+        except etree.XMLSyntaxError as e:
+            print(f"Could not parse XML list of files: {e}")
+            proc.kill()
+        error_output = proc.stderr.read()
+
+    if proc.returncode != 0 or project_xml is None:
+        print(f"Command {proc.args} failed")
+        print(error_output.decode(errors="replace"))
         exit(f"Error while downloading XML list of files for {target_project}")
 
-    return etree.fromstring(xml_query.stdout)
+    return project_xml
 
 
-def get_JGI_xml(o: Path, cookie_path: Path, project_dict: dict):
+def get_JGI_xml(o: Path, cookie: str, project_dict: dict):
     """
     Downloads an XML list of all files per project, for all projects.
     
@@ -573,34 +737,66 @@ def get_JGI_xml(o: Path, cookie_path: Path, project_dict: dict):
     See instructions in:
     https://genome.jgi.doe.gov/portal/help/download.jsf#/api
     """
-    if not cookie_path.is_file():
-        exit("Error (get_JGI_xml): cookie not a valid file.")
+    if not cookie:
+        exit("Error (get_JGI_xml): no JGI cookie.")
 
     xmlfile = o / "MycoCosm_data.xml"
-    
-    # See if we already have something
-    preexisting_data = set()
-    if xmlfile.is_file():
-        data = etree.parse(str(xmlfile))
-        root = data.getroot()
-        for child in root:
-            if child.tag == "organismDownloads":
-                preexisting_data.add(child.attrib["name"])
-    else:
-        # Otherwise create a new XML structure
-        root = etree.Element("Data", attrib={"name":"Mycocosm"})
-
-    # Query JGI for each project's (missing) data
-    for project in project_dict.keys():
-        if project in preexisting_data:
-            continue
 
-        project_xml = download_project_xml(cookie_path, project)
-        root.append(project_xml)
-
-        # Not ideal but better to write the file back each time in case process is interrupted
-        with open(xmlfile, "bw") as f:
-            f.write(etree.tostring(root, pretty_print=True))
+    # Data already in the XML file is copied over from here. If this file is
+    # already there, a previous run was interrupted while copying it over and
+    # the XML file itself is incomplete.
+    previous_xmlfile = o / "MycoCosm_data.xml.previous"
+    if xmlfile.is_file() and not previous_xmlfile.is_file():
+        xmlfile.replace(previous_xmlfile)
+
+    # Projects are appended to the file as they arrive, so it doesn't need to
+    # be written over again in case process is interrupted
+    with etree.xmlfile(str(xmlfile), encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element("Data", name="Mycocosm"):
+            # See if we already have something
+            preexisting_data = set()
+            if previous_xmlfile.is_file():
+                # Read one project at a time and free it once copied, so the
+                # whole file is never held in memory. If the last run was
+                # killed, the projects written in full are kept.
+                # Without recovery, only complete projects reach their end
+                # event: one cut off by the interruption raises and will be
+                # downloaded again.
+                previous_data = etree.iterparse(
+                    str(previous_xmlfile),
+                    events=("end",),
+                    tag="organismDownloads",
+                )
+                try:
+                    for _, elem in previous_data:
+                        preexisting_data.add(elem.get("name"))
+                        elem.tail = None
+                        xf.write(elem)
+                        elem.clear()
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
+                except etree.XMLSyntaxError:
+                    # Nothing (more) to recover
+                    pass
+                xf.flush()
+                previous_xmlfile.unlink()
+
+            # Query JGI for each project's (missing) data, several projects at a time
+            missing_projects = [p for p in project_dict if p not in preexisting_data]
+            with ThreadPoolExecutor(max_workers=XML_DOWNLOAD_WORKERS) as executor:
+                futures = [
+                    executor.submit(download_project_xml, cookie, project)
+                    for project in missing_projects
+                ]
+                try:
+                    for future in as_completed(futures):
+                        xf.write(future.result())
+                        xf.flush()
+                except BaseException:
+                    # Don't keep querying JGI if one of the downloads failed
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
 
     return True
 
@@ -618,83 +814,87 @@ def annotate_projects(organisms_csv: dict, xml_file: Path, hardcoded_gff_files:
     gff_filenames = defaultdict(list) # holds all found GFF3 annotation files
     skipped_gffs = set()
 
-    # Parse XML
-    root = etree.parse(str(xml_file)).getroot()
-    for portal_node in root:
-        if portal_node.tag != "organismDownloads":
+    # Parse XML one portal at a time, freeing each one once it's been processed.
+    # Only elements and attributes are used, so nothing else is kept.
+    for _, portal_node in etree.iterparse(
+        str(xml_file),
+        events=("end",),
+        tag="organismDownloads",
+        huge_tree=True,
+        collect_ids=False,
+        remove_blank_text=True,
+        remove_comments=True,
+        remove_pis=True,
+    ):
+        portal = portal_node.get("name")
+
+        # Drop the portals already processed so the tree never grows
+        while portal_node.getprevious() is not None:
+            del portal_node.getparent()[0]
+
+        if portal in PORTALS_TO_REMOVE:
             continue
 
-        portal = portal_node.attrib["name"]
+        org = organisms_csv.get(portal)
+        if org is None:
+            print(f"WARNING! Portal {portal} from XML file not found in CSV list.")
+            continue
 
         for child in portal_node:
             # The other option is "Mycocosm" which has a slightly different
             # set of files (at least for Trire2) but they seem to be on tape
-            if child.attrib["name"] == "Files":
+            if child.get("name") == "Files":
                 Fungi_files = child
                 break
         else:
             print(f"No 'Files' node in portal {portal}, skipping...")
             continue
 
-        # Initialize variables to None to avoid UnboundLocalError
-        asm_unmasked_node = None
-        asm_masked_node = None
-        gff_node = None
-        
-        for folder in Fungi_files:
-            if folder.attrib["name"] == "Assembly":
-                Assembly_folder = folder
-                for subfolder in Assembly_folder:
-                    if subfolder.attrib["name"] == "Genome Assembly (unmasked)":
-                        asm_unmasked_node = subfolder
-                    if subfolder.attrib["name"] == "Genome Assembly (masked)":
-                        asm_masked_node = subfolder    
-            if folder.attrib["name"] == "Annotation":
-                Annotation_folder = folder
-                for subfolder in Annotation_folder:
-                    if subfolder.attrib["name"] == 'Filtered Models ("best")':
-                        Filtered = subfolder
-                        for subsubfolder in Filtered:
-                            if subsubfolder.attrib["name"] == "Genes":
-                                gff_node = subsubfolder
-        
+        # Index each level by folder name; missing folders give None
+        folders = {folder.get("name"): folder for folder in Fungi_files}
+        Assembly_folder = {f.get("name"): f for f in folders.get("Assembly", ())}
+        asm_unmasked_node = Assembly_folder.get("Genome Assembly (unmasked)")
+        asm_masked_node = Assembly_folder.get("Genome Assembly (masked)")
+        Annotation_folder = {f.get("name"): f for f in folders.get("Annotation", ())}
+        Filtered = {
+            f.get("name"): f
+            for f in Annotation_folder.get('Filtered Models ("best")', ())
+        }
+        gff_node = Filtered.get("Genes")
+
         # Process unmasked assembly if available
         if asm_unmasked_node is not None:
-            annotate_assembly(organisms_csv, asm_unmasked_node)
+            annotate_assembly(org, asm_unmasked_node)
 
         # A few projects don't have unmasked assemblies. Assign masked ones in this case.
-        if not organisms_csv[portal].assembly_file:
+        if not org.assembly_file:
             print(f"Portal {portal} missing unmasked assembly. ", end="")
             if asm_masked_node is None:
                 print("Could not find masked assembly as fallback. Skipping assembly annotation for this portal.")
             else:
                 print("Attempting masked version...")
-                annotate_missing(organisms_csv, asm_masked_node)
+                annotate_missing(org, asm_masked_node)
         
         # Validate GFF node before annotation
         if gff_node is None:
             print(f"Portal '{portal}': Warning - Could not find GFF node (Filtered Models > best > Genes). "
                   "Skipping GFF annotation for this portal.")
         else:
-            annotate_gff(organisms_csv, gff_node, hardcoded_gff_files, gff_filenames, skipped_gffs)
+            annotate_gff(org, gff_node, hardcoded_gff_files, gff_filenames, skipped_gffs)
         
     # Write down all found annotation files.
     repeated_file = outputfolder / "List_gene_gff_filenames.txt"
-    with codecs.open(repeated_file, "w", encoding="utf-8") as f:
+    with open(repeated_file, "w", encoding="utf-8") as f:
         for portal in sorted(gff_filenames):
-            f.write(f"{portal} ({organisms_csv[portal].name})\n")
-            f.write(f"\t{organisms_csv[portal].project_path}\n")
+            org = organisms_csv[portal]
+            # One write per portal
+            lines = [f"{portal} ({org.name})\n", f"\t{org.project_path}\n"]
             for filename, dt in gff_filenames[portal]:
-                if filename in skipped_gffs:
-                    f.write(f"\t{dt.strftime('%Y-%m-%d')}\t{filename} (SKIPPED)")
-                else:
-                    f.write(f"\t{dt.strftime('%Y-%m-%d')}\t{filename}")
-
-                if filename == organisms_csv[portal].gff_file:
-                    f.write(" *\n")
-                else:
-                    f.write("\n")
-            f.write("\n")
+                skipped = " (SKIPPED)" if filename in skipped_gffs else ""
+                chosen = " *" if filename == org.gff_file else ""
+                lines.append(f"\t{dt:%Y-%m-%d}\t{filename}{skipped}{chosen}\n")
+            lines.append("\n")
+            f.write("".join(lines))
         
     # Report if we're missing annotation files
     portals_missing_gff_file = [
@@ -705,100 +905,73 @@ def annotate_projects(organisms_csv: dict, xml_file: Path, hardcoded_gff_files:
         print(f"Missing gffs from: {missing_gff_string}")
 
 
-def annotate_assembly(organisms_csv, xml_unmasked_assembly):
+def annotate_assembly(org, xml_unmasked_assembly):
     duplicated_names = []
-    portal = None  # Initialize to None to avoid UnboundLocalError if iterator yields no elements
+    portal = org.portal
     # Projects' names differ between what's annotated in the CSV and XML files.
     #
     # For example:
     # CSV: 'Mortierella humilis PMI_1414 v1.0'
     # XML: 'Mortierella humilis PMI_1414 - Glomeribacter phylotype 2 Fungal Standard Draft'
-    for element in xml_unmasked_assembly.iterdescendants():
-        filename = element.attrib["filename"]
-        url = element.attrib["url"]
-        portal = url.split("/")[2]
-        file_size = int(element.attrib["sizeInBytes"])
+    for element in FILE_ELEMENTS(xml_unmasked_assembly):
+        filename = element.get("filename")
+        url = element.get("url")
+        file_size = int(element.get("sizeInBytes"))
 
         if (
-            "MitoAssembly" in filename
-            or "MitoScaffolds" in filename
-            or "PrimaryAssemblyScaffolds" in filename
-            or "SecondaryAssemblyScaffolds" in filename
+            UNWANTED_ASSEMBLY_KEYWORDS.search(filename)
             or filename in EXCLUDE_ASSEMBLIES
-            or portal in PORTALS_TO_REMOVE
             or filename.endswith("txt")
         ):
             continue
 
-        try:
-            organisms_csv[portal].assembly_file = filename
-            organisms_csv[portal].assembly_url = url
-            organisms_csv[portal].assembly_size = file_size
-        except KeyError:
-            print(
-                f"WARNING! Portal {portal} from XML file not found in CSV list."
-            )
+        org.assembly_file = filename
+        org.assembly_url = url
+        org.assembly_size = file_size
 
         # Add filenames to list of found assembly files for this portal to check for multiple files
         duplicated_names.append(filename)
 
     # Check to see if there are multiple assembly files for this portal
     if len(duplicated_names) > 1:
-        if portal is not None:
-            print(f"WARNING! Portal {portal} has more than one assembly file.")     
-            dup_names = ", ".join(duplicated_names)
-            print(f"{portal}\t{dup_names}")
-            print("")
-        else:
-            print("WARNING! Multiple assembly files found but portal information is unavailable.")
+        print(f"WARNING! Portal {portal} has more than one assembly file.")
+        dup_names = ", ".join(duplicated_names)
+        print(f"{portal}\t{dup_names}")
+        print("")
     elif len(duplicated_names) == 0:
-        if portal is not None:
-            print(f"Portal {portal} has no (unmasked) assembly file.")
-        else:
-            print("No (unmasked) assembly files found in the provided XML data.")
+        print(f"Portal {portal} has no (unmasked) assembly file.")
 
     return
 
 
-def annotate_missing(organisms_csv, xml_masked_assembly):
+def annotate_missing(org, xml_masked_assembly):
     duplicated_names = []
-    portal = None  # Initialize to None to avoid UnboundLocalError if iterator yields no elements
-    for element in xml_masked_assembly.iterdescendants():
-        filename = element.attrib["filename"]
-        url = element.attrib["url"]
-        portal = url.split("/")[2]
-        file_size = int(element.attrib["sizeInBytes"])
+    portal = org.portal
+    for element in FILE_ELEMENTS(xml_masked_assembly):
+        filename = element.get("filename")
+        url = element.get("url")
+        file_size = int(element.get("sizeInBytes"))
 
         if (
-            "MitoAssembly" in filename
-            or "MitoScaffolds" in filename
-            or "PrimaryAssemblyScaffolds" in filename
-            or "SecondaryAssemblyScaffolds" in filename
+            UNWANTED_ASSEMBLY_KEYWORDS.search(filename)
             or filename in EXCLUDE_ASSEMBLIES
-            or portal in PORTALS_TO_REMOVE
             or filename.endswith("txt")
         ):
             continue
 
-        organisms_csv[portal].assembly_file = filename
-        organisms_csv[portal].assembly_url = url
-        organisms_csv[portal].assembly_size = file_size
+        org.assembly_file = filename
+        org.assembly_url = url
+        org.assembly_size = file_size
 
         duplicated_names.append(filename)
 
     if len(duplicated_names) > 1:
-        if portal is not None:
-            print(f"Warning: portal {portal} has more than one masked assembly file!")     
-            dup_names = ", ".join(duplicated_names)
-            print(f"{portal}\t{dup_names}")
-            print("")
-        else:
-            print("Warning: Multiple masked assembly files found but portal information is unavailable.")
+        print(f"Warning: portal {portal} has more than one masked assembly file!")
+        dup_names = ", ".join(duplicated_names)
+        print(f"{portal}\t{dup_names}")
+        print("")
     elif len(duplicated_names) == 0:
-        if portal is not None:
-            print(f"Portal {portal} has no (masked) assembly file")
-        else:
-            print("No (masked) assembly files found in the provided XML data.")
+        print(f"Portal {portal} has no (masked) assembly file")
 
     return
 
@@ -810,39 +983,43 @@ def get_hardcoded_gffs():
         print("Missing 'hardcoded_gff_files.tsv'.")
         return hgfs
 
-    with open(tsv_file) as f:
+    with open(tsv_file, encoding="utf-8") as f:
         for line in f:
             if line[0] == "#":
                 continue
-            portal, gff_file = line.strip().split("\t")
-            hgfs[portal] = gff_file
+            portal, sep, gff_file = line.partition("\t")
+            if not sep:
+                continue  # e.g. blank line
+            hgfs[portal] = gff_file.rstrip("\r\n")
 
     return hgfs
 
 
-def annotate_gff(organisms_csv, gff_node, hardcoded_gff_files, gff_filenames, skipped_gffs):
-    for element in gff_node.iterdescendants():
-        filename = element.attrib["filename"]
-        url = element.attrib["url"]
-        portal = url.split("/")[2]
-        timestamp = element.attrib["timestamp"]
-        file_size = int(element.attrib["sizeInBytes"])
-
-        if portal in PORTALS_TO_REMOVE:
-            continue
-
-        org = organisms_csv[portal]
+def annotate_gff(org, gff_node, hardcoded_gff_files, gff_filenames, skipped_gffs):
+    portal = org.portal
+    for element in FILE_ELEMENTS(gff_node):
+        filename = element.get("filename")
+        url = element.get("url")
+        timestamp = element.get("timestamp")
+        file_size = int(element.get("sizeInBytes"))
 
         # Convert the timestamp-date into a datetime object
         # For example: 'Sun Oct 12 11:02:03 PDT 2014'
-        wday, month, day, HMS, tz, y = timestamp.split(" ")
-        stringtimestamp = f"{US_DAY_NUMBERS[wday]}"
-        stringtimestamp += f" {US_MONTH_NUMBERS[month]}"
-        stringtimestamp += f" {day}"
-        stringtimestamp += f" {HMS}"
-        stringtimestamp += f" {US_TIMEZONES[tz]}"
-        stringtimestamp += f" {y}"
-        dt_timestamp = datetime.strptime(stringtimestamp, "%w %m %d %H:%M:%S %z %Y")
+        month, day, h, m, sec, tz, y = TIMESTAMP.match(timestamp).groups()
+        if tz in US_TIMEZONES:
+            tzinfo = US_TIMEZONES[tz]
+        else:
+            print(f"Warning: unknown timezone '{tz}' for {portal} ({filename}), taking it as UTC")
+            tzinfo = timezone.utc
+        dt_timestamp = datetime(
+            int(y),
+            US_MONTH_NUMBERS[month],
+            int(day),
+            int(h),
+            int(m),
+            int(sec),
+            tzinfo=tzinfo,
+        )
 
         gff_filenames[portal].append((filename, dt_timestamp))
 
@@ -866,17 +1043,18 @@ def annotate_gff(organisms_csv, gff_node, hardcoded_gff_files, gff_filenames, sk
             continue
 
         # Condition 3: if the filename contains certain keywords, skip
-        if "proteins" in filename.lower() \
-            or "secondary_alleles" in filename.lower() \
-            or "promoter_regions" in filename.lower():
+        if UNWANTED_GFF_KEYWORDS.search(filename):
             skipped_gffs.add(filename)
             continue
 
         # Condition 4: if the filename doesn't end with "gff.gz" or "gff3.gz", skip
-        if filename[-6:] == "gtf.gz" or filename[-3:] == "tgz" or filename[-2:] != "gz":
+        if filename.endswith(("gtf.gz", "tgz")) or not filename.endswith("gz"):
             skipped_gffs.add(filename)
             continue
 
+        is_gff3 = filename.endswith("gff3.gz")
+        is_gff = filename.endswith("gff.gz")
+
         if org.gff_file == "":
             # First filename for this portal, record
             org.gff_file = filename
@@ -884,25 +1062,22 @@ def annotate_gff(organisms_csv, gff_node, hardcoded_gff_files, gff_filenames, sk
             org.gff_timestamp = dt_timestamp
             org.gff_size = file_size
         else:
-            if filename[-7:] == "gff3.gz" and org.gff_file[-6:] == "gff.gz":
+            had_gff3 = org.gff_file.endswith("gff3.gz")
+            had_gff = org.gff_file.endswith("gff.gz")
+            if is_gff3 and had_gff:
                 # Had gff, now got gff3. Update
                 org.gff_file = filename
                 org.gff_url = url
                 org.gff_timestamp = dt_timestamp
                 org.gff_size = file_size
-            elif (
-                filename[-7:] == "gff3.gz"
-                and org.gff_file[-7:] == "gff3.gz"
-                or filename[-6:] == "gff.gz"
-                and org.gff_file[-6:] == "gff.gz"
-            ):
+            elif is_gff3 and had_gff3 or is_gff and had_gff:
                 if dt_timestamp > org.gff_timestamp:
                     # Keep the newest
                     org.gff_file = filename
                     org.gff_url = url
                     org.gff_timestamp = dt_timestamp
                     org.gff_size = file_size
-            elif filename[-6:] == "gff.gz" and org.gff_file[-7:] == "gff3.gz":
+            elif is_gff and had_gff3:
                 # A gff file appeared but we had gff3, skip
                 continue
             else:
@@ -919,30 +1094,108 @@ def annotate_gff(organisms_csv, gff_node, hardcoded_gff_files, gff_filenames, sk
 # FILE OPERATIONS
 # ============================================================================
 
-def download_file(url, local_path, cookie):
+def download_files(downloads, cookie, jobs) -> set:
     """
-    Handles downloads for files
+    Downloads all (url, local path) pairs with a single curl process, which
+    runs several transfers at a time and reuses its connections to JGI.
+    Returns the local paths (as str) that were downloaded successfully.
+    """
+    # URLs, output paths and the cookie go through stdin, as a curl config
+    config = [curl_cookie_config(cookie)]
+    for url, local_path in downloads:
+        config.append(curl_config_line("url", f"https://genome.jgi.doe.gov{url}"))
+        config.append(curl_config_line("output", str(local_path)))
+
+    command = []
+    command.append("curl")
+    command.append("--parallel")
+    command.append("--parallel-max")
+    command.append(str(jobs))
+    # (--silent doesn't hide the progress meter of parallel transfers)
+    command.append("--no-progress-meter")
+    # HTTP errors (e.g. expired cookie, missing file) must fail the transfer
+    # instead of saving the error page under the file's name
+    command.append("--fail")
+    command.append("--retry")
+    command.append("5")
+    # One line per finished transfer: curl's result code and the file written
+    command.append("--write-out")
+    command.append("%{exitcode}\t%{filename_effective}\n")
+    command.append("--config")
+    command.append("-")
+
+    proc = sp.run(
+        command,
+        shell=False,
+        input=b"".join(config),
+        stdout=sp.PIPE,
+    )
+
+    downloaded = set()
+    failed = set()
+    for line in proc.stdout.decode(errors="replace").splitlines():
+        exitcode, _, filename = line.partition("\t")
+        if exitcode == "0":
+            downloaded.add(filename)
+        elif exitcode.isdigit():
+            failed.add(filename)
+
+    for _, local_path in downloads:
+        local_path = str(local_path)
+        if local_path in failed:
+            # Don't leave partial files behind for the failed transfers
+            Path(local_path).unlink(missing_ok=True)
+        elif local_path not in downloaded and proc.returncode == 0:
+            # No usable result for this file (e.g. an old curl printing
+            # '%{exitcode}' as is): rely on curl's overall exit status
+            downloaded.add(local_path)
+
+    return downloaded
+
+
+def check_curl_version() -> None:
+    """
+    Exits if the installed curl can't run download_files
     """
-    command = [
-        "curl",
-        f"https://genome.jgi.doe.gov{url}",
-        "-b",
-        f"{cookie}",
-        "--retry",
-        "5",
-        "--output",
-        f"{local_path}",
-    ]
     try:
-        sp.run(command, shell=False, stdout=DEVNULL, stderr=STDOUT)
-    except CalledProcessError as e:
-        print(f" Error: {str(e.output)}")
-        return False
-    else:
-        return True
+        proc = sp.run(["curl", "--version"], stdout=sp.PIPE, encoding="utf-8")
+    except FileNotFoundError:
+        exit("Error: curl is needed to download files")
+
+    version = re.match(r"curl (\d+)\.(\d+)", proc.stdout)
+    if version is None:
+        exit("Error: cannot tell which version of curl is installed")
+    if (int(version[1]), int(version[2])) < CURL_MIN_VERSION:
+        minimum = ".".join(str(n) for n in CURL_MIN_VERSION)
+        exit(
+            f"Error: curl {minimum} or newer is needed to download files "
+            f"(found {version[1]}.{version[2]})"
+        )
+
+
+def copy_previous_file(old_file, output_folder, hardlink=False):
+    """
+    Puts a file from a previous run in the output folder. Hard links
+    share the data with the original file, so they're only made on request
+    """
+    new_file = output_folder / old_file.name
+    # --previous may list this very file (built from the same output tree):
+    # there's nothing to copy, and removing it would lose the only copy
+    if new_file.exists() and os.path.samefile(old_file, new_file):
+        return
+    # Never write through an existing (possibly linked) incomplete file
+    new_file.unlink(missing_ok=True)
+    if hardlink:
+        try:
+            os.link(old_file, new_file)
+        except OSError:
+            pass  # e.g. different filesystem; copy instead
+        else:
+            return
+    shutil.copyfile(old_file, new_file)
 
 
-def get_aux_files(args, cookie_path) -> None:
+def get_aux_files(args) -> None:
     if args.update:
         print("Updating NCBI taxonomy database")
         ncbi = NCBITaxa()
@@ -965,12 +1218,13 @@ def get_aux_files(args, cookie_path) -> None:
     if args.getxml:
         mycocosm_csv = o / "MycoCosm_Genome_list.csv"
         print("Downloading XML file")
-        if not JGI_login(cookie_path, args.credentials_file):
+        cookie = JGI_login(args.credentials_file)
+        if not cookie:
             exit("Error: Cannot log in to JGI...")
         elif not mycocosm_csv.is_file():
             exit("Error downloading XML files: download genome list first")
 
-        if get_JGI_xml(o, cookie_path, read_mycocosm_csv(mycocosm_csv)):
+        if get_JGI_xml(o, cookie, read_mycocosm_csv(mycocosm_csv)):
             print("  Done")
         else:
             print("  Cannot download MycoCosm's XML file...")
@@ -983,44 +1237,24 @@ def get_aux_files(args, cookie_path) -> None:
         with open(
             Path(__file__).parent / "previously_downloaded_files.tsv", "w"
         ) as f:
-            for gz in p.glob("**/*.gz"):
-                f.write(f"{gz.name}\t{gz.parent}\n")
+            # Walk the folders with scandir: no Path objects nor extra
+            # stat calls for each file found
+            folders = [str(p)]
+            while folders:
+                folder = folders.pop()
+                try:
+                    with os.scandir(folder) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                folders.append(entry.path)
+                            elif entry.name.endswith(".gz"):
+                                f.write(f"{entry.name}\t{folder}\n")
+                except OSError:
+                    continue  # unreadable folder
         print("  Done")
     return
 
 
-def parse_xml(xml):
-    """
-    Reads the XML file and returns the nodes containing portals' main data
-    """
-    doc = etree.parse(str(xml))
-    root = doc.getroot()
-    for child in root:
-        if child.attrib["name"] == "Files":
-            Fungi_files = child
-            break
-
-    for folder in Fungi_files:
-        if folder.attrib["name"] == "Assembly":
-            for subfolder in folder:
-                if subfolder.attrib["name"] == "Genome Assembly (unmasked)":
-                    asm_unmasked_node = subfolder
-                if subfolder.attrib["name"] == "Genome Assembly (masked)":
-                    asm_masked_node = subfolder
-                    
-
-        if folder.attrib["name"] == "Annotation":
-            Annotation_folder = folder
-            for subfolder in Annotation_folder:
-                if subfolder.attrib["name"] == 'Filtered Models ("best")':
-                    Filtered = subfolder
-                    for subsubfolder in Filtered:
-                        if subsubfolder.attrib["name"] == "Genes":
-                            gff_node = subsubfolder
-
-    return asm_unmasked_node, asm_masked_node, gff_node
-
-
 # ============================================================================
 # MAIN WORKFLOW
 # ============================================================================
@@ -1028,12 +1262,11 @@ def parse_xml(xml):
 def main():
     # ========== INITIALIZATION ==========
     args = command_parser()
-    cookie_path = Path(__file__).parent / "jgi_cookie.txt"
 
     # ========== AUXILIARY OPERATIONS ==========
     # Handle --update, --getgenomelist, --getxml, --getprevious options and exit
     if args.update or args.getgenomelist or args.getxml or args.getprevious:
-        get_aux_files(args, cookie_path)
+        get_aux_files(args)
         exit("All data fetched")
     
     # ========== INPUT VALIDATION ==========
@@ -1069,22 +1302,26 @@ def main():
     annotate_projects(organisms_csv, args.xml, hardcoded_gff_files, o)
 
     # ========== LOGIN & DOWNLOAD PREPARATION ==========
+    cookie = ""
     if args.simulate:
         print("\nBeginning simulation")
     else:
         print("\nBeginning file download")
-        if not JGI_login(cookie_path, args.credentials_file):
+        check_curl_version()
+        cookie = JGI_login(args.credentials_file)
+        if not cookie:
             exit("Error: Failed to log in to JGI...")
 
     # ========== GENERATE DOWNLOAD LIST & PROCESS FILES ==========
     # Create a checkpoint file listing all files for each portal
     download_list_file = f"JGI_download_list_{time.strftime('%Y-%m-%d', time.localtime())}.txt"
     with open(o / download_list_file, "w", encoding="utf-8") as f:
-        for portal in organisms_csv:
-            fungus = organisms_csv[portal]
-            f.write(f"{portal} ({fungus.name})\n")
-            f.write(f"Assembly:\t{fungus.assembly_file}\n")
-            f.write(f"GFF:\t\t{fungus.gff_file}\n\n")
+        for portal, fungus in organisms_csv.items():
+            f.write(
+                f"{portal} ({fungus.name})\n"
+                f"Assembly:\t{fungus.assembly_file}\n"
+                f"GFF:\t\t{fungus.gff_file}\n\n"
+            )
 
     # Finally, get the files
     needed = 0
@@ -1092,9 +1329,11 @@ def main():
     downloaded = 0
     pre_existing = 0
     in_previous = 0
-    with open(o / "JGI_taxonomy.tsv", "w", encoding="utf-8") as tf:
-        tf.write(
-            "Short name\tAccession\tTaxId\tName\tPath\tAssembly file\tGFF file\tlineage\n"
+    downloads = []  # (url, local path, file type) to fetch once all portals are checked
+    with open(o / "JGI_taxonomy.tsv", "w", encoding="utf-8", newline="") as tf:
+        taxonomy_tsv = csv.writer(tf, delimiter="\t", lineterminator="\n")
+        taxonomy_tsv.writerow(
+            ("Short name", "Accession", "TaxId", "Name", "Path", "Assembly file", "GFF file", "lineage")
         )
 
         for portal, fungus in organisms_csv.items():
@@ -1121,20 +1360,28 @@ def main():
             if not output_folder.is_dir():
                 output_folder.mkdir(exist_ok=True, parents=True)
 
-            tf.write(portal)
-            tf.write(f"\t{portal}")
-            tf.write(f"\t{fungus.TaxId}")
-            tf.write(f"\t{fungus.name}")
-            tf.write(f"\t{base_folder}")
-            tf.write(f"\t{fungus.assembly_file}")
-            tf.write(f"\t{fungus.gff_file}")
-            tf.write(f"\t{fungus.lineage_list}\n")
+            # Sizes of the files already in the folder, read in one go
+            with os.scandir(output_folder) as entries:
+                existing = {e.name: e.stat().st_size for e in entries if e.is_file()}
+
+            taxonomy_tsv.writerow(
+                (
+                    portal,
+                    portal,
+                    fungus.TaxId,
+                    fungus.name,
+                    base_folder,
+                    fungus.assembly_file,
+                    fungus.gff_file,
+                    ",".join(fungus.lineage),
+                )
+            )
 
             asm = output_folder / fungus.assembly_file
             gff = output_folder / fungus.gff_file
 
             # Assembly
-            if asm.is_file() and asm.stat().st_size > 0.9 * fungus.assembly_size:
+            if existing.get(fungus.assembly_file, -1) > 0.9 * fungus.assembly_size:
                 # File already there, skipping
                 pre_existing += 1
             elif fungus.assembly_file in location_previous:
@@ -1146,20 +1393,17 @@ def main():
                         / fungus.assembly_file
                     )
                     try:
-                        shutil.copy(old_file, output_folder)
+                        copy_previous_file(old_file, output_folder, args.hardlink)
                     except:
                         exit(f"Error: cannot copy {old_file} into {output_folder}")
                     else:
                         copied += 1
             else:
                 if not args.simulate:
-                    if download_file(fungus.assembly_url, asm, cookie_path):
-                        downloaded += 1
-                    else:
-                        print(f"Warning: could not download assembly {asm}")
+                    downloads.append((fungus.assembly_url, asm, "assembly"))
 
             # GFF
-            if gff.is_file() and gff.stat().st_size > 0.9 * fungus.gff_size:
+            if existing.get(fungus.gff_file, -1) > 0.9 * fungus.gff_size:
                 pre_existing += 1
             elif fungus.gff_file in location_previous:
                 if args.simulate:
@@ -1169,17 +1413,27 @@ def main():
                         Path(location_previous[fungus.gff_file]) / fungus.gff_file
                     )
                     try:
-                        shutil.copy(old_file, output_folder)
+                        copy_previous_file(old_file, output_folder, args.hardlink)
                     except:
                         exit(f"Error: cannot copy {old_file} into {output_folder}")
                     else:
                         copied += 1
             else:
                 if not args.simulate:
-                    if download_file(fungus.gff_url, gff, cookie_path):
-                        downloaded += 1
-                    else:
-                        print(f"Warning: could not download gff {gff}")
+                    downloads.append((fungus.gff_url, gff, "gff"))
+
+    # Download the files, several at a time
+    if downloads:
+        got = download_files(
+            [(url, local_path) for url, local_path, _ in downloads],
+            cookie,
+            max(1, args.jobs),
+        )
+        for _, local_path, file_type in downloads:
+            if str(local_path) in got:
+                downloaded += 1
+            else:
+                print(f"Warning: could not download {file_type} {local_path}")
 
     print("...done\n")
 
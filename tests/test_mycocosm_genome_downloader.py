@@ -0,0 +1,129 @@
+"""
+Tests for mycocosm_genome_downloader.py
+
+Run from the repository root with:
+    python -m unittest discover tests
+"""
+
+import subprocess as sp
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import mycocosm_genome_downloader as mgd
+
+
+class DownloadFilesTest(unittest.TestCase):
+    """download_files with curl replaced by canned --write-out output"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.folder = Path(tmp.name)
+        self.good = self.folder / "good.gz"
+        self.bad = self.folder / "bad.gz"
+        self.good.write_bytes(b"data")
+        self.bad.write_bytes(b"<html>error</html>")
+        self.downloads = [("/good", self.good), ("/bad", self.bad)]
+
+    def run_curl(self, stdout, returncode):
+        result = sp.CompletedProcess(["curl"], returncode, stdout=stdout.encode())
+        with mock.patch.object(mgd.sp, "run", return_value=result):
+            return mgd.download_files(self.downloads, "session=1", 2)
+
+    def test_exit_codes(self):
+        got = self.run_curl(f"0\t{self.good}\n22\t{self.bad}\n", 22)
+        self.assertEqual(got, {str(self.good)})
+        self.assertTrue(self.good.is_file())
+        self.assertFalse(self.bad.exists())
+
+    def test_no_exit_codes_curl_succeeded(self):
+        # curl older than 7.75 prints the variable as is
+        got = self.run_curl(
+            f"%{{exitcode}}\t{self.good}\n%{{exitcode}}\t{self.bad}\n", 0
+        )
+        self.assertEqual(got, {str(self.good), str(self.bad)})
+        self.assertTrue(self.good.is_file())
+        self.assertTrue(self.bad.is_file())
+
+    def test_no_exit_codes_curl_failed(self):
+        got = self.run_curl(
+            f"%{{exitcode}}\t{self.good}\n%{{exitcode}}\t{self.bad}\n", 22
+        )
+        self.assertEqual(got, set())
+        # Without a per-file result, nothing is deleted
+        self.assertTrue(self.good.is_file())
+        self.assertTrue(self.bad.is_file())
+
+    def test_missing_lines(self):
+        got = self.run_curl(f"0\t{self.good}\n", 0)
+        self.assertEqual(got, {str(self.good), str(self.bad)})
+
+
+class CheckCurlVersionTest(unittest.TestCase):
+    def run_version(self, stdout):
+        result = sp.CompletedProcess(["curl", "--version"], 0, stdout=stdout)
+        with mock.patch.object(mgd.sp, "run", return_value=result):
+            mgd.check_curl_version()
+
+    def test_new_enough(self):
+        self.run_version("curl 7.88.1 (x86_64-pc-linux-gnu) libcurl/7.88.1\n")
+        self.run_version("curl 8.5.0 (x86_64-pc-linux-gnu) libcurl/8.5.0\n")
+
+    def test_too_old(self):
+        with self.assertRaises(SystemExit):
+            self.run_version("curl 7.68.0 (x86_64-pc-linux-gnu) libcurl/7.68.0\n")
+
+
+class GetFinalOutputFolderTest(unittest.TestCase):
+    """Paths must stay those of the original if/elif folder checks"""
+
+    CASES = (
+        ((), "no_rank/no_rank"),
+        (("dikarya",), "DIKARYA/no_rank"),
+        (
+            ("dikarya", "ascomycota", "pezizomycotina", "sordariomycetes"),
+            "DIKARYA/ASCOMYCOTA/PEZIZOMYCOTINA/SORDARIOMYCETES",
+        ),
+        (
+            ("dikarya", "basidiomycota", "agaricomycotina", "agaricomycetes"),
+            "DIKARYA/BASIDIOMYCOTA/AGARICOMYCOTINA/AGARICOMYCETES",
+        ),
+        (
+            ("dikarya", "ascomycota", "saccharomycotina"),
+            "DIKARYA/ASCOMYCOTA/SACCHAROMYCOTINA",
+        ),
+        (("dikarya", "mucoromycota"), "DIKARYA/no_rank"),
+        (("mucoromycota", "mucoromycotina"), "no_rank/MUCOROMYCOTA/MUCOROMYCOTINA"),
+        (("chytridiomycota",), "no_rank/CHYTRIDIOMYCOTA/no_rank/no_rank"),
+        (
+            ("chytridiomycota", "chytridiomycetes"),
+            "no_rank/CHYTRIDIOMYCOTA/no_rank/CHYTRIDIOMYCETES",
+        ),
+        # Phyla outside Dikarya are checked independently of each other
+        (("mucoromycota", "zoopagomycota"), "no_rank/MUCOROMYCOTA/ZOOPAGOMYCOTA/no_rank"),
+        (
+            ("chytridiomycota", "zoopagomycota"),
+            "no_rank/ZOOPAGOMYCOTA/CHYTRIDIOMYCOTA/no_rank/no_rank",
+        ),
+        (
+            ("chytridiomycota", "mucoromycota", "zoopagomycota"),
+            "no_rank/MUCOROMYCOTA/ZOOPAGOMYCOTA/CHYTRIDIOMYCOTA/no_rank/no_rank",
+        ),
+        # More than one JGI branch
+        (("sordariomycetes", "agaricomycetes"), "no_rank/no_rank"),
+    )
+
+    def test_paths(self):
+        for lineage, expected in self.CASES:
+            with self.subTest(lineage=lineage):
+                got = mgd.get_final_output_folder(Path("./"), frozenset(lineage))
+                self.assertEqual(got, Path(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()